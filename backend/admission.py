@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+# Load shedding for the WebSocket endpoint: token buckets for per-connection and
+# per-game message rates, plus event-loop lag / memory checks for new games.
+
+# uvicorn's --ws-max-size is set from the same WS_MAX_FRAME_BYTES variable
+# (backend/Dockerfile, docker-compose.yml); keep the defaults in sync.
+MAX_FRAME_BYTES = int(os.environ.get("WS_MAX_FRAME_BYTES", 4096))
+MAX_LOOP_LAG = float(os.environ.get("WS_MAX_LOOP_LAG", 0.25))  # seconds
+MAX_MEMORY_MB = float(os.environ.get("WS_MAX_MEMORY_MB", 1024))
+
+# Messages that rebuild or reshuffle the game cost more than a regular move
+MESSAGE_COST = {
+    "RESET": 5.0,
+    "START_GAME": 5.0,
+    "NEXT_ROUND": 5.0,
+}
+# Dropping these would stall the table (a lost move, or a lost ANIMATION_COMPLETE
+# driving the AI turn), so they are delayed instead and never charged to the game
+GAME_ADVANCING = {"PLAY_CARD", "ANIMATION_COMPLETE"}
+# Commands that redeal or rebuild the whole table also take one token each from the
+# per-game bucket; a dropped one duplicates a command another player just sent
+TABLE_WIDE = {"RESET", "START_GAME", "NEXT_ROUND"}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.clock = clock
+        self.updated = clock()
+
+    def consume(self, cost: float = 1.0) -> bool:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def delay(self, cost: float = 1.0) -> float:
+        """Always takes the tokens, returning how long to wait before acting."""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate) - cost
+        self.updated = now
+        return max(0.0, -self.tokens / self.rate)
+
+
+def connection_bucket() -> TokenBucket:
+    return TokenBucket(rate=10.0, burst=30.0)
+
+
+def game_bucket() -> TokenBucket:
+    # Table-wide commands only, shared by every connection at the table:
+    # a burst of 2, then one every 5 seconds
+    return TokenBucket(rate=0.2, burst=2.0)
+
+
+def strike_bucket() -> TokenBucket:
+    # Rate-limited messages a connection may send before it is closed
+    return TokenBucket(rate=1.0, burst=50.0)
+
+
+def memory_mb() -> Optional[float]:
+    # Current RSS from /proc; None where it is unavailable (no peak-RSS fallback,
+    # it never goes down and would lock out new games for good)
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes up from a fixed sleep."""
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - start - self.interval)
+
+
+def overload_reason(monitor: LoopLagMonitor) -> Optional[str]:
+    """Returns why new games should be refused, or None if the worker has headroom."""
+    if monitor.lag > MAX_LOOP_LAG:
+        return f"event loop lag {monitor.lag:.3f}s"
+    mem = memory_mb()
+    if mem is not None and mem > MAX_MEMORY_MB:
+        return f"memory {mem:.0f}MB"
+    return None
@@ -0,0 +1,228 @@
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from typing import Iterator, List, NamedTuple, Optional
+
+# Columnar export of finished games for offline analytics.
+#
+# Files are append-only, one per UTC day (games-YYYYMMDD.bin). Each record is
+# prefixed by <4sII (MAGIC, body length, crc32 of body) so a reader can resync
+# past a record left half-written by a crash. The body is:
+#   header        <BBHB   version, n_players, n_moves, n_rounds
+#   names         n_players x (u8 length + utf-8 bytes)
+#   is_ai         n_players x u8
+#   final_scores  n_players x u16
+#   move_player   n_moves x u8
+#   move_card     n_moves x u8   (card index 0..39, see game_logic.card_index)
+#   move_flags    n_moves x u8   (bit 0: chkouba)
+#   move_capture  n_moves x u64  (bitmask of captured table cards by card index)
+#   round_end     n_rounds x u16 (move count at the end of each round)
+#   round_scores  n_rounds x n_players x len(SCORE_FIELDS) x u16
+
+RECORD_VERSION = 2
+SCORE_FIELDS = [
+    "Carta_Amt", "Carta_Pt",
+    "Dinari_Amt", "Dinari_Pt",
+    "Sebaa_Amt", "Sebaa_Pt",
+    "Bermila_Amt", "Bermila_Pt",
+    "Chkouba_Amt", "Chkouba_Pt",
+]
+FLAG_CHKOUBA = 1
+MAGIC = b"CKGR"
+MAX_RECORD_BYTES = 1 << 20
+
+_PREFIX = struct.Struct("<4sII")
+_HEADER = struct.Struct("<BBHB")
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+class GameRecord(NamedTuple):
+    names: List[str]
+    is_ai: bytes
+    final_scores: array      # 'H'
+    move_player: bytes
+    move_card: bytes
+    move_flags: bytes
+    move_capture: array      # 'Q'
+    round_end: array         # 'H'
+    round_scores: array      # 'H', flat, index with round_score()
+
+    def round_score(self, round_idx: int, player_idx: int, field: str) -> int:
+        n_players = len(self.names)
+        offset = (round_idx * n_players + player_idx) * len(SCORE_FIELDS)
+        return self.round_scores[offset + SCORE_FIELDS.index(field)]
+
+
+def _le_bytes(typecode: str, values) -> bytes:
+    a = array(typecode, values)
+    if _BIG_ENDIAN:
+        a.byteswap()
+    return a.tobytes()
+
+
+def _le_array(typecode: str, data) -> array:
+    a = array(typecode)
+    a.frombytes(data)
+    if _BIG_ENDIAN:
+        a.byteswap()
+    return a
+
+
+def encode_game(engine) -> bytes:
+    """Pack a finished ChkoubaEngine into one length-prefixed record."""
+    players = engine.state.players
+    moves = engine.moves
+    parts = [_HEADER.pack(RECORD_VERSION, len(players), len(moves), len(engine.round_ends))]
+    for p in players:
+        # Truncate on a character boundary so the name always decodes
+        name = p.name.encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8")
+        parts.append(bytes([len(name)]) + name)
+    parts.append(bytes(1 if p.is_ai else 0 for p in players))
+    parts.append(_le_bytes("H", (engine.state.scores.get(p.name, 0) for p in players)))
+    parts.append(bytes(m[0] for m in moves))
+    parts.append(bytes(m[1] for m in moves))
+    parts.append(bytes(FLAG_CHKOUBA if m[3] else 0 for m in moves))
+    parts.append(_le_bytes("Q", (m[2] for m in moves)))
+    parts.append(_le_bytes("H", engine.round_ends))
+    parts.append(_le_bytes("H", (
+        details.get(field, 0)
+        for round_details in engine.round_scores
+        for details in round_details
+        for field in SCORE_FIELDS
+    )))
+    body = b"".join(parts)
+    return _PREFIX.pack(MAGIC, len(body), zlib.crc32(body)) + body
+
+
+def decode_game(body: bytes) -> GameRecord:
+    view = memoryview(body)
+    version, n_players, n_moves, n_rounds = _HEADER.unpack_from(view, 0)
+    if version != RECORD_VERSION:
+        raise ValueError(f"Unsupported game record version {version}")
+    pos = _HEADER.size
+    names = []
+    for _ in range(n_players):
+        size = view[pos]
+        names.append(bytes(view[pos + 1:pos + 1 + size]).decode("utf-8"))
+        pos += 1 + size
+
+    def take(size):
+        nonlocal pos
+        chunk = view[pos:pos + size]
+        pos += size
+        return chunk
+
+    is_ai = bytes(take(n_players))
+    final_scores = _le_array("H", take(2 * n_players))
+    move_player = bytes(take(n_moves))
+    move_card = bytes(take(n_moves))
+    move_flags = bytes(take(n_moves))
+    move_capture = _le_array("Q", take(8 * n_moves))
+    round_end = _le_array("H", take(2 * n_rounds))
+    round_scores = _le_array("H", take(2 * n_rounds * n_players * len(SCORE_FIELDS)))
+    return GameRecord(names, is_ai, final_scores, move_player, move_card,
+                      move_flags, move_capture, round_end, round_scores)
+
+
+def read_records(path: str, chunk_size: int = 1 << 20) -> Iterator[GameRecord]:
+    """Stream records from an export file without loading it whole.
+
+    Damaged data (e.g. a record half-written before a crash, followed by
+    records appended after the restart) is skipped by scanning for the next
+    MAGIC whose length and checksum are valid.
+    """
+    buf = bytearray()
+    eof = False
+    with open(path, "rb") as f:
+        while not eof:
+            chunk = f.read(chunk_size)
+            if chunk:
+                buf += chunk
+            else:
+                eof = True
+            pos = 0
+            while True:
+                start = buf.find(MAGIC, pos)
+                if start < 0:
+                    # Keep a tail that may hold the start of a split MAGIC
+                    pos = max(pos, len(buf) - len(MAGIC) + 1)
+                    break
+                pos = start
+                if len(buf) - pos < _PREFIX.size:
+                    break
+                _, size, crc = _PREFIX.unpack_from(buf, pos)
+                end = pos + _PREFIX.size + size
+                if size > MAX_RECORD_BYTES or (eof and end > len(buf)):
+                    pos += 1
+                    continue
+                if end > len(buf):
+                    break
+                body = bytes(buf[pos + _PREFIX.size:end])
+                if zlib.crc32(body) != crc:
+                    pos += 1
+                    continue
+                yield decode_game(body)
+                pos = end
+            del buf[:pos]
+
+
+class GameRecordWriter:
+    """Buffers encoded games and appends them to daily files from a background thread."""
+
+    def __init__(self, directory: str, flush_every: int = 256, flush_interval: float = 5.0):
+        self.directory = directory
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="game-record-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, engine) -> None:
+        """Queue a finished game; each engine is exported at most once per game."""
+        if engine.recorded:
+            return
+        engine.recorded = True
+        try:
+            self._queue.put_nowait(encode_game(engine))
+        except Exception as e:
+            print(f"ERROR encoding game record: {e}", flush=True)
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, time.strftime("games-%Y%m%d.bin", time.gmtime()))
+
+    def _flush(self, pending: List[bytes]) -> None:
+        if not pending:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._path(), "ab") as f:
+                f.write(b"".join(pending))
+        except OSError as e:
+            print(f"ERROR writing {len(pending)} game records: {e}", flush=True)
+        pending.clear()
+
+    def _run(self) -> None:
+        pending: List[bytes] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = b""
+            if item is None:
+                self._flush(pending)
+                return
+            if item:
+                pending.append(item)
+            if len(pending) >= self.flush_every or time.monotonic() >= deadline:
+                self._flush(pending)
+                deadline = time.monotonic() + self.flush_interval
@@ -26,10 +26,15 @@ class GameState(BaseModel):
     scores: Dict[str, int] = {} # Overall game scores
     score_details: Dict[str, Dict[str, int]] = {} # Detailed breakdown for UI
 
+SUITS = ['H', 'S', 'D', 'C'] # Hearts, Spades, Diamonds, Clubs
+
+def card_index(card: Card) -> int:
+    # Compact 0..39 index, used by the game record export
+    return SUITS.index(card.suit) * 10 + card.value - 1
+
 def create_deck() -> List[Card]:
-    suits = ['H', 'S', 'D', 'C'] # Hearts, Spades, Diamonds, Clubs
     deck = []
-    for suit in suits:
+    for suit in SUITS:
         for val in range(1, 11):
             deck.append(Card(suit=suit, value=val, id=f"{val}{suit}")) # Value then Suit for ID
     random.shuffle(deck)
@@ -42,6 +47,13 @@ class ChkoubaEngine:
             self.state.players.append(Player(name=name))
         for i in range(ai_count):
             self.state.players.append(Player(name=f"AI {i+1}", is_ai=True))
+
+        # Game history for offline analytics (kept out of GameState so it is not broadcast)
+        # moves: (player_index, card_index, capture_mask, chkouba)
+        self.moves: List[Tuple[int, int, int, bool]] = []
+        self.round_ends: List[int] = [] # len(self.moves) at the end of each round
+        self.round_scores: List[List[Dict[str, int]]] = [] # score_details per player, per round
+        self.recorded = False
         
         # Don't start automatically
         # self.start_new_round()
@@ -102,6 +114,7 @@ class ChkoubaEngine:
         if valid_combos and capture_combo_index is not None:
             combo = valid_combos[capture_combo_index]
             # Capture
+            chkoubas_before = player.chkoubas
             player.captured_cards.append(card)
             player.captured_cards.extend(combo)
             
@@ -116,9 +129,14 @@ class ChkoubaEngine:
                 player.chkoubas += 1
                 print(f"TRACE: CHKOUBA! by {player.name}", flush=True)
             self.state.last_capture_player_index = player_index
+            capture_mask = 0
+            for c in combo:
+                capture_mask |= 1 << card_index(c)
+            self.moves.append((player_index, card_index(card), capture_mask, player.chkoubas > chkoubas_before))
         else:
             # Drop card
             self.state.table.append(card)
+            self.moves.append((player_index, card_index(card), 0, False))
         
         player.hand.remove(card)
         current_scores = {p.name: self.state.scores.get(p.name, 0) for p in self.state.players}
@@ -226,6 +244,9 @@ class ChkoubaEngine:
             details["Bermila_Amt"] = 1 if bermila_pt > 0 else 0 
             
             self.state.score_details[name] = details
+
+        self.round_ends.append(len(self.moves))
+        self.round_scores.append([dict(self.state.score_details[p.name]) for p in self.state.players])
             
         # Check for game over (usually 21 points)
         for name, score in self.state.scores.items():
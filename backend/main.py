@@ -1,12 +1,34 @@
+import os
 import json
 import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from game_logic import ChkoubaEngine, GameState
-from typing import Dict, List
+from game_export import GameRecordWriter
+from admission import (GAME_ADVANCING, MAX_FRAME_BYTES, MESSAGE_COST, TABLE_WIDE, LoopLagMonitor,
+                       TokenBucket, connection_bucket, game_bucket, overload_reason, strike_bucket)
+from typing import Dict, List, Optional
 from fastapi.encoders import jsonable_encoder
 
-app = FastAPI()
+# Finished games are appended to daily columnar files for offline analytics.
+# Created in lifespan so importing this module doesn't start the writer thread.
+recorder: Optional[GameRecordWriter] = None
+loop_monitor = LoopLagMonitor()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global recorder
+    recorder = GameRecordWriter(os.environ.get("GAME_RECORD_DIR", "game_records"))
+    loop_monitor.start()
+    try:
+        yield
+    finally:
+        loop_monitor.stop()
+        recorder.close()
+        recorder = None
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +40,34 @@ app.add_middleware(
 
 # In-memory store for game sessions
 games: Dict[str, ChkoubaEngine] = {}
+# Last encoded state per game, so GET_STATE spam doesn't re-encode an unchanged state
+state_cache: Dict[str, dict] = {}
+game_buckets: Dict[str, TokenBucket] = {}
+
+def table_bucket(game_id: str) -> TokenBucket:
+    bucket = game_buckets.get(game_id)
+    if bucket is None:
+        bucket = game_buckets[game_id] = game_bucket()
+    return bucket
+
+def record_game(game: ChkoubaEngine):
+    if recorder is not None and game.state.game_over:
+        recorder.submit(game)
+
+def leave_game(game_id: str, websocket: WebSocket):
+    manager.disconnect(game_id, websocket)
+    # Auto-Delete the game and its caches once the last connection is gone
+    if not manager.active_connections.get(game_id):
+        print(f"DEBUG: Game {game_id} has no more players. Deleting...", flush=True)
+        manager.active_connections.pop(game_id, None)
+        games.pop(game_id, None)
+        state_cache.pop(game_id, None)
+        game_buckets.pop(game_id, None)
+
+def encode_state(game_id: str) -> dict:
+    state_data = jsonable_encoder(games[game_id].state)
+    state_cache[game_id] = state_data
+    return state_data
 
 class ConnectionManager:
     def __init__(self):
@@ -67,6 +117,15 @@ async def get_games():
 @app.websocket("/ws/{game_id}/{player_name}")
 async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: str, count: int = 2, ai: int = 0):
     print(f"DEBUG: New connection request: {game_id}, {player_name}, ai={ai}", flush=True)
+    if game_id not in games or games[game_id].state.game_over:
+        reason = overload_reason(loop_monitor)
+        if reason:
+            print(f"WARN: Rejecting new game {game_id}: {reason}", flush=True)
+            # Accept first so the client sees 1013 instead of a failed handshake
+            await websocket.accept()
+            await websocket.close(code=1013, reason="Server busy")
+            return
+
     try:
         await manager.connect(game_id, websocket)
         print(f"DEBUG: Connection accepted for {game_id}", flush=True)
@@ -74,6 +133,12 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
         print(f"ERROR: Failed to accept connection: {e}", flush=True)
         return
 
+    try:
+        await run_session(websocket, game_id, player_name, count, ai)
+    finally:
+        leave_game(game_id, websocket)
+
+async def run_session(websocket: WebSocket, game_id: str, player_name: str, count: int, ai: int):
     # Initialize or join game
     player_name = player_name.strip()
     try:
@@ -90,6 +155,7 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
 
             print(f"DEBUG: Starting new game {game_id} with Players: {player_names} + {ai_count} AI", flush=True)
             games[game_id] = ChkoubaEngine(player_names, ai_count=ai_count)
+            game_buckets[game_id] = game_bucket()
             print(f"DEBUG: Game engine started", flush=True)
         else:
             # Join existing game
@@ -106,7 +172,7 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                      placeholder.name = player_name
                      
                      # Broadcast update so Host sees the new player!
-                     state_data = jsonable_encoder(game.state)
+                     state_data = encode_state(game_id)
                      await manager.broadcast(game_id, {
                         "type": "UPDATE",
                         "state": state_data
@@ -129,21 +195,47 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
     try:
         # Send initial state
         print(f"DEBUG: Sending initial state for {game_id}", flush=True)
-        state_data = jsonable_encoder(games[game_id].state)
+        state_data = encode_state(game_id)
         
         await websocket.send_json({
             "type": "INIT",
             "state": state_data
         })
         print(f"DEBUG: Initial state sent", flush=True)
+
+        conn_bucket = connection_bucket()
+        strikes = strike_bucket()
+        throttled = False
         
         while True:
             try:
                 data = await websocket.receive_text()
+                frame_bytes = len(data.encode("utf-8"))
+                if frame_bytes > MAX_FRAME_BYTES:
+                    print(f"WARN: Frame of {frame_bytes} bytes from {player_name} in {game_id}, closing", flush=True)
+                    await websocket.close(code=1009, reason="Frame too large")
+                    break
                 message = json.loads(data)
+                msg_type = message.get("type")
+                cost = MESSAGE_COST.get(msg_type, 1.0)
+
+                if msg_type in GAME_ADVANCING:
+                    # Never drop moves: slow this connection down instead
+                    await asyncio.sleep(conn_bucket.delay(cost))
+                elif not conn_bucket.consume(cost) or (
+                        msg_type in TABLE_WIDE and not table_bucket(game_id).consume()):
+                    if not strikes.consume():
+                        print(f"WARN: {player_name} in {game_id} kept flooding, closing", flush=True)
+                        await websocket.close(code=1008, reason="Rate limit exceeded")
+                        break
+                    if not throttled:
+                        throttled = True
+                        await websocket.send_json({"type": "ERROR", "reason": "RATE_LIMITED", "message_type": msg_type})
+                    continue
+                throttled = False
                 
                 if message.get("type") == "GET_STATE":
-                    state_data = jsonable_encoder(games[game_id].state)
+                    state_data = state_cache.get(game_id) or encode_state(game_id)
                     await websocket.send_json({
                         "type": "UPDATE",
                         "state": state_data
@@ -160,13 +252,14 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                             game = games[game_id]
                             success = game.play_card(p_idx, c_id, combo_idx)
                             if success:
+                                record_game(game)
                                 # Verify if round ended
                                 if game.state.round_finished:
                                     print(f"DEBUG: Round finished, dealing new", flush=True)
                                     game.start_new_round()
                                 
                                 # Broadcast State
-                                state_data = jsonable_encoder(game.state)
+                                state_data = encode_state(game_id)
                                 await manager.broadcast(game_id, {
                                     "type": "UPDATE",
                                     "state": state_data
@@ -178,7 +271,7 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                                     print("DEBUG: Human emptying hands. Refilling in 1s...", flush=True)
                                     await asyncio.sleep(1.0)
                                     game.deal_cards()
-                                    state_data = jsonable_encoder(game.state)
+                                    state_data = encode_state(game_id)
                                     await manager.broadcast(game_id, {
                                         "type": "UPDATE",
                                         "state": state_data
@@ -208,9 +301,10 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                                 if ai_card_id:
                                     print(f"DEBUG: AI plays {ai_card_id}, combo {ai_combo_idx}", flush=True)
                                     game.play_card(ai_idx, ai_card_id, ai_combo_idx)
+                                    record_game(game)
                                     
                                     # Broadcast New State (triggering frontend animation)
-                                    state_data = jsonable_encoder(game.state)
+                                    state_data = encode_state(game_id)
                                     await manager.broadcast(game_id, {
                                         "type": "UPDATE",
                                         "state": state_data
@@ -221,7 +315,7 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                                     if players_empty and game.state.deck and not game.state.round_finished:
                                         await asyncio.sleep(2.0) # Wait for table clear anim
                                         game.deal_cards()
-                                        state_data = jsonable_encoder(game.state)
+                                        state_data = encode_state(game_id)
                                         await manager.broadcast(game_id, {
                                             "type": "UPDATE",
                                             "state": state_data
@@ -233,12 +327,14 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
 
                 elif message.get("type") == "NEXT_ROUND":
                     game = games[game_id]
-                    game.start_new_round()
-                    state_data = jsonable_encoder(game.state)
-                    await manager.broadcast(game_id, {
-                        "type": "UPDATE", 
-                        "state": state_data
-                    })
+                    # Only between rounds: redealing mid-round would reshuffle everyone's table
+                    if game.state.round_finished:
+                        game.start_new_round()
+                        state_data = encode_state(game_id)
+                        await manager.broadcast(game_id, {
+                            "type": "UPDATE", 
+                            "state": state_data
+                        })
                             
                 elif message.get("type") == "RESET":
                     print(f"DEBUG: Resetting game {game_id}", flush=True)
@@ -248,7 +344,7 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                     game.__init__([p.name for p in game.state.players if not p.is_ai], ai_count=current_ai_count)
                     game.start_game() # Explicitly start on reset
                     
-                    state_data = jsonable_encoder(game.state)
+                    state_data = encode_state(game_id)
                     await manager.broadcast(game_id, {
                         "type": "INIT",
                         "state": state_data
@@ -262,7 +358,7 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                     if not game.state.started:
                          game.start_game()
                          print(f"DEBUG: START GAME Table has {len(game.state.table)} cards: {[c.id for c in game.state.table]}", flush=True)
-                         state_data = jsonable_encoder(game.state)
+                         state_data = encode_state(game_id)
                          await manager.broadcast(game_id, {
                             "type": "UPDATE",
                             "state": state_data
@@ -270,14 +366,6 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
 
             except WebSocketDisconnect:
                 print(f"DEBUG: Client disconnected {game_id}", flush=True)
-                manager.disconnect(game_id, websocket)
-                
-                # Setup Auto-Delete if empty
-                if game_id in manager.active_connections:
-                     if len(manager.active_connections[game_id]) == 0:
-                         print(f"DEBUG: Game {game_id} has no more players. Deleting...", flush=True)
-                         if game_id in games:
-                             del games[game_id]
                 break
             except Exception as e:
                 print(f"ERROR inside loop: {e}", flush=True)
@@ -285,4 +373,3 @@ async def websocket_endpoint(websocket: WebSocket, game_id: str, player_name: st
                 
     except Exception as e:
         print(f"CRITICAL Connection Error: {e}", flush=True)
-        manager.disconnect(game_id, websocket)
@@ -0,0 +1,55 @@
+import sys
+import traceback
+
+try:
+    from admission import TokenBucket, LoopLagMonitor, overload_reason, MESSAGE_COST
+
+    now = [0.0]
+    bucket = TokenBucket(rate=2.0, burst=4.0, clock=lambda: now[0])
+
+    print("Testing burst...")
+    allowed = sum(1 for _ in range(10) if bucket.consume())
+    if allowed != 4:
+        print(f"ERROR: Expected burst of 4, got {allowed}")
+        sys.exit(1)
+
+    print("Testing refill...")
+    now[0] += 1.0
+    allowed = sum(1 for _ in range(10) if bucket.consume())
+    if allowed != 2:
+        print(f"ERROR: Expected 2 tokens after 1s, got {allowed}")
+        sys.exit(1)
+
+    print("Testing expensive messages...")
+    now[0] += 100.0
+    if not bucket.consume(MESSAGE_COST["RESET"] - 1) or bucket.consume(MESSAGE_COST["RESET"]):
+        print("ERROR: Burst cap not applied to expensive messages")
+        sys.exit(1)
+
+    print("Testing delay for game-advancing messages...")
+    now[0] += 100.0
+    delays = [bucket.delay() for _ in range(6)]
+    if delays[:4] != [0.0] * 4 or delays[4] != 0.5 or delays[5] != 1.0:
+        print(f"ERROR: Unexpected delays {delays}")
+        sys.exit(1)
+    now[0] += 1.0 # Slept for the last delay
+    if bucket.delay() != 0.5:
+        print("ERROR: Delayed tokens not repaid")
+        sys.exit(1)
+
+    print("Testing admission...")
+    monitor = LoopLagMonitor()
+    if overload_reason(monitor) is not None:
+        print("ERROR: Idle worker should admit new games")
+        sys.exit(1)
+    monitor.lag = 10.0
+    if overload_reason(monitor) is None:
+        print("ERROR: Lagging worker should refuse new games")
+        sys.exit(1)
+
+    print("Test Complete: SUCCESS")
+
+except Exception as e:
+    print("\nCRITICAL FAILURE:")
+    traceback.print_exc()
+    sys.exit(1)
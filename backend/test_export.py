@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import traceback
+
+try:
+    from game_logic import ChkoubaEngine
+    from game_export import GameRecordWriter, encode_game, read_records, SCORE_FIELDS
+
+    print("Simulating AI vs AI game...")
+    game = ChkoubaEngine([], ai_count=2)
+    game.start_game()
+    while not game.state.game_over:
+        card_id, combo_idx = game.get_ai_move()
+        game.play_card(game.state.current_player_index, card_id, combo_idx)
+        if game.state.round_finished and not game.state.game_over:
+            game.start_new_round()
+        elif all(not p.hand for p in game.state.players) and game.state.deck:
+            game.deal_cards()
+    print(f"Game over after {len(game.round_ends)} rounds, {len(game.moves)} moves.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer = GameRecordWriter(directory)
+        writer.submit(game)
+        writer.submit(game) # Already recorded, must be ignored
+        writer.close()
+
+        files = os.listdir(directory)
+        records = list(read_records(os.path.join(directory, files[0])))
+
+    if len(records) != 1:
+        print(f"ERROR: Expected 1 record, got {len(records)}")
+        sys.exit(1)
+    record = records[0]
+    if record.names != [p.name for p in game.state.players]:
+        print("ERROR: Player names mismatch")
+        sys.exit(1)
+    if list(record.move_card) != [m[1] for m in game.moves] or list(record.move_capture) != [m[2] for m in game.moves]:
+        print("ERROR: Move columns mismatch")
+        sys.exit(1)
+    if list(record.final_scores) != [game.state.scores[p.name] for p in game.state.players]:
+        print("ERROR: Final scores mismatch")
+        sys.exit(1)
+    last_round = len(record.round_end) - 1
+    for i, p in enumerate(game.state.players):
+        for field in SCORE_FIELDS:
+            if record.round_score(last_round, i, field) != game.state.score_details[p.name][field]:
+                print(f"ERROR: {field} mismatch for {p.name}")
+                sys.exit(1)
+
+    print("Testing damaged file recovery...")
+    game.state.players[0].name = "\u00e9" * 200 # 400 bytes, truncated on a character boundary
+    game.round_scores[-1][0]["Carta_Amt"] = 300 # Cumulative amounts can exceed a byte
+    record_bytes = encode_game(game)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.bin")
+        with open(path, "wb") as f:
+            # Half-written record (crash), then records appended after a restart
+            f.write(record_bytes[:len(record_bytes) // 2] + record_bytes + record_bytes)
+        records = list(read_records(path, chunk_size=97))
+
+    if len(records) != 2:
+        print(f"ERROR: Expected 2 records after damaged data, got {len(records)}")
+        sys.exit(1)
+    if records[0].names[0] != "\u00e9" * 127:
+        print(f"ERROR: Name not truncated on a character boundary: {records[0].names[0]!r}")
+        sys.exit(1)
+    if records[0].round_score(last_round, 0, "Carta_Amt") != 300:
+        print("ERROR: Round score clamped")
+        sys.exit(1)
+
+    print("Test Complete: SUCCESS")
+
+except Exception as e:
+    print("\nCRITICAL FAILURE:")
+    traceback.print_exc()
+    sys.exit(1)
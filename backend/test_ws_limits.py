@@ -0,0 +1,116 @@
+import json
+import sys
+import threading
+import traceback
+
+try:
+    from fastapi.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+    import main
+
+    # No context manager: skips startup/shutdown so the loop monitor and game recorder stay untouched
+    client = TestClient(main.app)
+
+    def fail(msg):
+        print(f"ERROR: {msg}")
+        sys.exit(1)
+
+    def close_code(ws):
+        try:
+            while True:
+                ws.receive_json()
+        except WebSocketDisconnect as e:
+            return e.code
+
+    def assert_cleaned_up(game_id):
+        if (game_id in main.games or game_id in main.state_cache
+                or game_id in main.game_buckets or game_id in main.manager.active_connections):
+            fail(f"Game {game_id} left behind after its last connection closed")
+
+    print("Testing oversized frame...")
+    with client.websocket_connect("/ws/G1/P1") as ws:
+        ws.receive_json() # INIT
+        ws.send_text(json.dumps({"type": "GET_STATE", "pad": "é" * 2500}, ensure_ascii=False)) # Under 4096 chars, over 4096 bytes
+        if close_code(ws) != 1009:
+            fail("Oversized frame not closed with 1009")
+    assert_cleaned_up("G1")
+
+    print("Testing flood close...")
+    with client.websocket_connect("/ws/G2/P1") as ws:
+        ws.receive_json() # INIT
+        for _ in range(200):
+            ws.send_text(json.dumps({"type": "GET_STATE"}))
+        if close_code(ws) != 1008:
+            fail("Flooding client not closed with 1008")
+    assert_cleaned_up("G2")
+
+    print("Testing GET_STATE served from cache...")
+    calls = []
+    encoder = main.jsonable_encoder
+    main.jsonable_encoder = lambda obj: calls.append(obj) or encoder(obj)
+    try:
+        with client.websocket_connect("/ws/G3/P1") as ws:
+            init = ws.receive_json()
+            for _ in range(5):
+                ws.send_text(json.dumps({"type": "GET_STATE"}))
+                if ws.receive_json() != {"type": "UPDATE", "state": init["state"]}:
+                    fail("GET_STATE returned a different state")
+    finally:
+        main.jsonable_encoder = encoder
+    if len(calls) != 1:
+        fail(f"Expected 1 state encode (INIT), got {len(calls)}")
+    assert_cleaned_up("G3")
+
+    print("Testing admission control...")
+    main.loop_monitor.lag = 10.0
+    try:
+        with client.websocket_connect("/ws/G4/P1") as ws:
+            if close_code(ws) != 1013:
+                fail("New game under load not refused with 1013")
+    finally:
+        main.loop_monitor.lag = 0.0
+    assert_cleaned_up("G4")
+
+    print("Testing per-game limit on table-wide commands...")
+    with client.websocket_connect("/ws/G5/P1") as ws1:
+        ws1.receive_json() # INIT
+        with client.websocket_connect("/ws/G5/P2") as ws2:
+            ws1.receive_json() # UPDATE, P2 took a seat
+            ws2.receive_json() # UPDATE
+            ws2.receive_json() # INIT
+            for _ in range(2): # Game bucket burst
+                ws1.send_text(json.dumps({"type": "RESET"}))
+                if ws1.receive_json()["type"] != "INIT" or ws2.receive_json()["type"] != "INIT":
+                    fail("RESET within the game budget not broadcast")
+            ws2.send_text(json.dumps({"type": "RESET"}))
+            reply = ws2.receive_json()
+            if reply != {"type": "ERROR", "reason": "RATE_LIMITED", "message_type": "RESET"}:
+                fail(f"Second connection's RESET not refused by the game bucket: {reply}")
+    assert_cleaned_up("G5")
+
+    print("Testing NEXT_ROUND mid-round is ignored...")
+    with client.websocket_connect("/ws/G6/P1") as ws:
+        init = ws.receive_json()
+        ws.send_text(json.dumps({"type": "NEXT_ROUND"}))
+        ws.send_text(json.dumps({"type": "GET_STATE"}))
+        if ws.receive_json() != {"type": "UPDATE", "state": init["state"]}:
+            fail("NEXT_ROUND redealt a round that was not finished")
+    assert_cleaned_up("G6")
+
+    print("Testing lifespan...")
+    def writer_running():
+        return any(t.name == "game-record-writer" for t in threading.enumerate())
+    if writer_running():
+        fail("Game record writer started at import time")
+    with TestClient(main.app):
+        if main.recorder is None or not writer_running():
+            fail("Game record writer not started by lifespan")
+    if main.recorder is not None or writer_running():
+        fail("Game record writer not closed on shutdown")
+
+    print("Test Complete: SUCCESS")
+
+except Exception as e:
+    print("\nCRITICAL FAILURE:")
+    traceback.print_exc()
+    sys.exit(1)
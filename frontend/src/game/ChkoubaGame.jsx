@@ -72,6 +72,8 @@ const ChkoubaGame = ({ playerName, playerCount, gameId, aiCount = 1, onQuit }) =
                 const data = JSON.parse(event.data);
                 if (data.type === 'INIT' || data.type === 'UPDATE') {
                     setGameState(data.state); // Update React State
+                } else if (data.type === 'ERROR') {
+                    console.warn("Server rejected", data.message_type, data.reason);
                 }
             } catch (e) { console.error("WS Parse Error", e); }
         };